@@ -1,14 +1,25 @@
-import json
-from fastapi import FastAPI, HTTPException
+import msgspec
+import numpy as np
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Dict, List
+from fastapi.responses import ORJSONResponse
+from typing import Dict, List, Optional
+import itertools
 import math
-import random
+import os
+import re
+import threading
 import time
 from pathlib import Path
 
-app = FastAPI(title="Ragnarok Drop Simulator API")
+# Cada worker do uvicorn cria seu próprio pool de threads do Numba;
+# limita o tamanho dele para não abrir ~nproc threads por worker
+os.environ.setdefault("NUMBA_NUM_THREADS", "2")
+
+from numba import njit, prange  # noqa: E402
+
+app = FastAPI(title="Ragnarok Drop Simulator API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,8 +35,170 @@ DATA_FILE = BASE_DIR / "data" / "drops.json"
 if not DATA_FILE.exists():
     raise RuntimeError(f"Arquivo de dados não encontrado: {DATA_FILE}")
 
-with DATA_FILE.open("r", encoding="utf-8") as f:
-    DATA = json.load(f)
+DATA = orjson.loads(DATA_FILE.read_bytes())
+
+# "geometric" (padrão) sorteia direto da distribuição; "monte_carlo" rola kill a kill
+SIMULATION_METHOD = os.environ.get("SIMULATION_METHOD", "geometric")
+
+# ----------------------------
+# ÍNDICES PRÉ-CALCULADOS
+# ----------------------------
+# DATA é imutável após o carregamento, então tudo que os endpoints
+# precisam é resolvido uma única vez aqui.
+
+class Item:
+    __slots__ = ("name", "base", "is_florzinha")
+
+    def __init__(self, name: str, base: float, is_florzinha: bool):
+        self.name = name
+        self.base = base
+        self.is_florzinha = is_florzinha
+
+
+CONTENTS = DATA.get("contents", {})
+
+# item_id -> Item
+ITEMS = {
+    item_id: Item(
+        item.get("name", item_id),
+        float(item.get("base_drop_percent", 0.0)),
+        item.get("is_florzinha", False),
+    )
+    for item_id, item in DATA.get("items", {}).items()
+}
+
+# (content_id, level_id) -> [(item_id, name, base_drop_percent, is_florzinha), ...]
+LEVEL_DROPS = {}
+
+# (content_id, level_id) -> (monsters, [(item_id, name, [rate_por_monstro, ...]), ...])
+MONSTER_DROPS = {}
+
+# (content_id, level_id) -> np.ndarray float64 com os base_drop_percent de LEVEL_DROPS
+LEVEL_BASES = {}
+
+# (content_id, level_id) -> np.ndarray float64 (n_items, n_monsters) com as taxas de MONSTER_DROPS
+MONSTER_BASE = {}
+
+# (content_id, level_id) -> ids / nomes das linhas de MONSTER_BASE
+MONSTER_ITEM_IDS = {}
+MONSTER_ITEM_NAMES = {}
+
+# monster_id -> nome de exibição
+MONSTER_DISPLAY = {}
+
+# (content_id, level_id) -> [{"monster_id": ..., "name": ...}, ...]
+LEVEL_MONSTER_INFO = {}
+
+# content_id -> [(level_id, level_data), ...] já ordenado pelo número do nível
+LEVELS_SORTED = {}
+
+for _content_id, _content in CONTENTS.items():
+    LEVELS_SORTED[_content_id] = sorted(_content.get("levels", {}).items(), key=lambda kv: int(kv[0]))
+
+    for _level_id, _level in _content.get("levels", {}).items():
+        _key = (_content_id, _level_id)
+        _drops = _level.get("drops", [])
+
+        LEVEL_DROPS[_key] = [
+            (item_id, ITEMS[item_id].name, ITEMS[item_id].base, ITEMS[item_id].is_florzinha)
+            for item_id in _drops
+            if item_id in ITEMS
+        ]
+        LEVEL_BASES[_key] = np.array([p_base for _, _, p_base, _ in LEVEL_DROPS[_key]], dtype=np.float64)
+
+        if _content.get("type") == "monster_table":
+            _monsters = tuple(_level.get("monsters", []))
+            MONSTER_DROPS[_key] = (
+                _monsters,
+                [
+                    (
+                        item_id,
+                        ITEMS[item_id].name,
+                        [float(monster_rates.get(m, 0.0)) for m in _monsters],
+                    )
+                    for item_id, monster_rates in _drops.items()
+                    if item_id in ITEMS
+                ],
+            )
+            MONSTER_BASE[_key] = np.array(
+                [rates for _, _, rates in MONSTER_DROPS[_key][1]], dtype=np.float64
+            ).reshape(len(MONSTER_DROPS[_key][1]), len(_monsters))
+            MONSTER_ITEM_IDS[_key] = [item_id for item_id, _, _ in MONSTER_DROPS[_key][1]]
+            MONSTER_ITEM_NAMES[_key] = [name for _, name, _ in MONSTER_DROPS[_key][1]]
+            for _m in _monsters:
+                if _m not in MONSTER_DISPLAY:
+                    MONSTER_DISPLAY[_m] = _m.replace("_", " ").title()
+            LEVEL_MONSTER_INFO[_key] = [
+                {"monster_id": m, "name": MONSTER_DISPLAY[m]} for m in _monsters
+            ]
+
+# ----------------------------
+# RESPOSTAS PRÉ-RENDERIZADAS DOS GETs
+# ----------------------------
+# As rotas GET dependem só de DATA, então o JSON de cada uma é
+# serializado uma vez na inicialização.
+
+
+def _render_contents():
+    result = []
+    for content_id, content_data in CONTENTS.items():
+        result.append({
+            "content_id": content_id,
+            "name": content_data.get("name", content_id),
+            "type": content_data.get("type", "normal")
+        })
+    return {"contents": result}
+
+
+def _render_levels(content_id):
+    result = []
+    for level_num, level_data in LEVELS_SORTED[content_id]:
+        result.append({
+            "level_id": level_num,
+            "name": level_data.get("name", f"Level {level_num}")
+        })
+    return {"levels": result}
+
+
+def _render_drops(key):
+    return {
+        "drops": [
+            {"item_id": item_id, "name": name, "base_drop_percent": p_base}
+            for item_id, name, p_base, _ in LEVEL_DROPS[key]
+        ]
+    }
+
+
+def _render_monster_drops(key):
+    monsters, level_drops = MONSTER_DROPS[key]
+
+    # Monta os dados dos drops
+    drops_info = []
+    for item_id, name, rates in level_drops:
+        drops_info.append({
+            "item_id": item_id,
+            "item_name": name,
+            "rates": dict(zip(monsters, rates))
+        })
+
+    return {
+        "content_id": key[0],
+        "level_id": key[1],
+        "monsters": LEVEL_MONSTER_INFO[key],
+        "drops": drops_info
+    }
+
+
+# ("contents",) | ("levels", content_id) | ("drops" | "monster-drops", content_id, level_id) -> bytes
+GET_CACHE = {("contents",): orjson.dumps(_render_contents())}
+
+for _content_id, _content in CONTENTS.items():
+    GET_CACHE[("levels", _content_id)] = orjson.dumps(_render_levels(_content_id))
+    for _level_id in _content.get("levels", {}):
+        _key = (_content_id, _level_id)
+        GET_CACHE[("drops", *_key)] = orjson.dumps(_render_drops(_key))
+        if _key in MONSTER_DROPS:
+            GET_CACHE[("monster-drops", *_key)] = orjson.dumps(_render_monster_drops(_key))
 
 # ----------------------------
 # CONSUMÍVEIS — REGRAS NOVAS
@@ -60,14 +233,132 @@ FINAL_CONS = {
     "amantes": 4.0,
 }
 
+# Maestrias (bônus FINAL) — vale a primeira selecionada de cada grupo
+ADV_MASTERY = {"adv_1": 1.0, "adv_2": 3.0, "adv_3": 5.0, "adv_4": 8.0}
+BIRTH_MASTERY = {"birth_1": 1.0, "birth_2": 2.0, "birth_3": 3.0, "birth_4": 5.0}
+REBORN_MASTERY = {"reborn_1": 1.0, "reborn_2": 2.0, "reborn_3": 3.0, "reborn_4": 5.0, "reborn_5": 8.0}
+
+_LOG_HALF = math.log(0.5)
+
+# ----------------------------
+# CONSUMÍVEIS — TABELAS POR BITMASK
+# ----------------------------
+# Cada consumível conhecido ocupa um bit. As regras acima são avaliadas
+# uma única vez para todas as combinações possíveis; na requisição basta
+# montar a máscara e fazer o lookup.
+
+CONS_BIT = {name: 1 << i for i, name in enumerate([*BIG_CONS, *GENERAL_CONS, *FINAL_CONS])}
+CALICE_MASK = CONS_BIT["calice"] | CONS_BIT["calice2"]
+
+# Bits de BIG_CONS + GENERAL_CONS (contíguos a partir do bit 0)
+GENERAL_MASK = (1 << (len(BIG_CONS) + len(GENERAL_CONS))) - 1
+# Os bits de FINAL_CONS vêm logo em seguida
+FINAL_SHIFT = len(BIG_CONS) + len(GENERAL_CONS)
+
 
-class Scenario(BaseModel):
+def _general_cons_mods(mask: int):
+    """Mods GERAIS {chave: bônus} dos consumíveis para uma combinação"""
+    mods = {}
+
+    # 1 — maior bônus dos 4 principais
+    best_big = max((val for key, val in BIG_CONS.items() if mask & CONS_BIT[key]), default=0.0)
+    if best_big > 0:
+        mods["consumable_big"] = best_big
+
+    # flags
+    used_calice = bool(mask & CONS_BIT["calice"])
+    used_big = bool(mask & CALICE_MASK)
+
+    # 2 — consumíveis gerais SOMADOS com regras
+    for key, val in GENERAL_CONS.items():
+        if not mask & CONS_BIT[key]:
+            continue
+        if key in ("lata", "revitalizadora"):
+            if not used_big:
+                mods[key] = val
+        elif key == "drop_pot":
+            if not used_calice:
+                mods[key] = val
+        else:
+            mods[key] = val
+
+    return mods
+
+
+def _final_cons_mods(mask: int):
+    """Mods FINAIS {chave: bônus} dos consumíveis para uma combinação"""
+    # 3 — consumíveis finais sempre somam
+    return {
+        f"final_{key}": val
+        for key, val in FINAL_CONS.items()
+        if (mask << FINAL_SHIFT) & CONS_BIT[key]
+    }
+
+
+# Guardam as chaves (e não só a soma): um mod do frontend com a mesma chave
+# de um consumível é sobrescrito por ele, e não somado duas vezes
+GENERAL_CONS_MODS = [_general_cons_mods(m) for m in range(GENERAL_MASK + 1)]
+FINAL_CONS_MODS = [_final_cons_mods(m) for m in range(1 << len(FINAL_CONS))]
+
+# Mods gerais que só valem num conteúdo específico: mod -> content_id
+CONTENT_ONLY_MODS = {
+    "dominio_reputation": "dominio",
+    "member_bonus": "villa_of_zenys",
+}
+
+# content_id -> mods do frontend ignorados nesse conteúdo
+EXCLUDED_GENERAL_MODS = {
+    content_id: frozenset(mod for mod, only_in in CONTENT_ONLY_MODS.items() if only_in != content_id)
+    for content_id in CONTENTS
+}
+
+
+def consumables_mask(consumables: List[str]) -> int:
+    """Converte a lista de consumíveis da requisição em bitmask"""
+    mask = 0
+    for c in consumables:
+        mask |= CONS_BIT.get(c, 0)
+    return mask
+
+
+def _merged_sum(request_mods, *overrides, excluded=frozenset()):
+    """Soma de {**request_mods, **overrides...} sem os excluídos, sem montar o dict"""
+    # Mesma ordem de soma do dict mesclado: chaves da requisição (com o valor
+    # sobrescrito) e depois as chaves novas de cada override, em ordem
+    def merged(key, val):
+        for mods in reversed(overrides):
+            if key in mods:
+                return mods[key]
+        return val
+
+    return sum(itertools.chain(
+        (merged(key, val) for key, val in request_mods.items() if key not in excluded),
+        (val for mods in overrides for key, val in mods.items() if key not in request_mods),
+    ))
+
+
+def _resolve_mods(req, content_id: Optional[str] = None, extra_final=None):
+    """Retorna (B_general, B_final) somando os mods do frontend e os consumíveis"""
+    mask = consumables_mask(req.consumables)
+
+    # Sem content_id (drop_calculate) nenhum mod é excluído
+    excluded = EXCLUDED_GENERAL_MODS.get(content_id, frozenset())
+    B_general = _merged_sum(req.general_mods, GENERAL_CONS_MODS[mask & GENERAL_MASK], excluded=excluded)
+    # As chaves de extra_final (maestrias) nunca coincidem com final_<consumível>
+    B_final = _merged_sum(req.final_mods, FINAL_CONS_MODS[mask >> FINAL_SHIFT], extra_final or {})
+    return B_general, B_final
+
+
+class Scenario(msgspec.Struct):
+    item_id: str
     general_mods: Dict[str, float]
     final_mods: Dict[str, float]
     consumables: List[str]
+    num_kills: int = 1
+    mc_simulations: int = 1000
 
 
-class BatchCalculateRequest(BaseModel):
+class BatchCalculateRequest(msgspec.Struct):
     content_id: str
     level_id: str
     general_mods: Dict[str, float]
@@ -75,228 +366,162 @@ class BatchCalculateRequest(BaseModel):
     consumables: List[str]
 
 
+def _body_errors(e: msgspec.DecodeError):
+    """Converte o erro do msgspec no formato de erro de validação do FastAPI"""
+    if not isinstance(e, msgspec.ValidationError):
+        return [{"type": "json_invalid", "loc": ["body"], "msg": "JSON decode error", "ctx": {"error": str(e)}}]
+
+    msg, _, path = str(e).partition(" - at `")
+    loc = ["body"]
+    for name, index in re.findall(r"\.(\w+)|\[(\d+)\]", path):
+        loc.append(name or int(index))
+
+    missing = re.fullmatch(r"Object missing required field `(.+)`", msg)
+    if missing:
+        return [{"type": "missing", "loc": loc + [missing.group(1)], "msg": "Field required"}]
+    return [{"type": "value_error", "loc": loc, "msg": msg}]
+
+
+def _is_json(content_type: Optional[str]) -> bool:
+    """Mesma regra do FastAPI: application/json ou application/*+json"""
+    if not content_type:
+        return False
+    maintype, _, subtype = content_type.split(";", 1)[0].strip().lower().partition("/")
+    return maintype == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+
+def _bools_as_numbers(obj, model):
+    """Troca true/false por 1/0 nos campos numéricos, como o Pydantic aceitava"""
+    if not isinstance(obj, dict):
+        return obj
+    for field in msgspec.structs.fields(model):
+        val = obj.get(field.encode_name)
+        if field.type in (int, float) and type(val) is bool:
+            obj[field.encode_name] = field.type(val)
+        elif field.type == Dict[str, float] and isinstance(val, dict):
+            obj[field.encode_name] = {k: float(v) if type(v) is bool else v for k, v in val.items()}
+    return obj
+
+
+def msgspec_body(model):
+    """Dependência que decodifica o corpo JSON direto no Struct informado"""
+    # strict=False aceita as mesmas coerções do Pydantic (ex.: "5" -> 5.0)
+    decoder = msgspec.json.Decoder(model, strict=False)
+
+    async def parse_body(request: Request):
+        body = await request.body()
+        if not body:
+            raise HTTPException(
+                status_code=422,
+                detail=[{"type": "missing", "loc": ["body"], "msg": "Field required", "input": None}],
+            )
+        if not _is_json(request.headers.get("content-type")):
+            raise HTTPException(status_code=422, detail=[{
+                "type": "model_attributes_type",
+                "loc": ["body"],
+                "msg": "Input should be a valid dictionary or object to extract fields from",
+                "input": body.decode(errors="replace"),
+            }])
+
+        try:
+            try:
+                return decoder.decode(body)
+            except msgspec.ValidationError:
+                # Só quando o caminho rápido falha: o Pydantic aceitava
+                # true/false como número, o msgspec não
+                return msgspec.convert(_bools_as_numbers(msgspec.json.decode(body), model), model, strict=False)
+        except msgspec.DecodeError as e:
+            raise HTTPException(status_code=422, detail=_body_errors(e))
+
+    return parse_body
+
+
+def msgspec_openapi(model):
+    """openapi_extra com o schema do corpo, já que ele não passa mais pelo Pydantic"""
+    _, components = msgspec.json.schema_components((model,), ref_template="#/components/schemas/{name}")
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": components[model.__name__]}},
+            "required": True,
+        }
+    }
+
+
 # ============================================================
 # NOVOS ENDPOINTS — Seleção de Conteúdo, Nível e Drops
 # ============================================================
 
 @app.get("/contents")
-def list_contents():
+async def list_contents():
     """Retorna lista de todos os conteúdos disponíveis"""
-    contents = DATA.get("contents", {})
-    result = []
-    for content_id, content_data in contents.items():
-        result.append({
-            "content_id": content_id,
-            "name": content_data.get("name", content_id),
-            "type": content_data.get("type", "normal")
-        })
-    return {"contents": result}
+    return Response(content=GET_CACHE[("contents",)], media_type="application/json")
 
 
 @app.get("/contents/{content_id}/levels")
-def list_levels(content_id: str):
+async def list_levels(content_id: str):
     """Retorna lista de níveis para um conteúdo específico"""
-    contents = DATA.get("contents", {})
-    if content_id not in contents:
+    cached = GET_CACHE.get(("levels", content_id))
+    if cached is None:
         raise HTTPException(status_code=404, detail="Content not found")
     
-    content = contents[content_id]
-    levels = content.get("levels", {})
-    result = []
-    
-    for level_num, level_data in levels.items():
-        result.append({
-            "level_id": level_num,
-            "name": level_data.get("name", f"Level {level_num}")
-        })
-    
-    # Ordena pelos níveis numéricos
-    result.sort(key=lambda x: int(x["level_id"]))
-    return {"levels": result}
+    return Response(content=cached, media_type="application/json")
 
 
 @app.get("/contents/{content_id}/levels/{level_id}/drops")
-def list_drops(content_id: str, level_id: str):
+async def list_drops(content_id: str, level_id: str):
     """Retorna lista de drops disponíveis para um nível específico"""
-    contents = DATA.get("contents", {})
-    if content_id not in contents:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
-    content = contents[content_id]
-    levels = content.get("levels", {})
-    if level_id not in levels:
+    cached = GET_CACHE.get(("drops", content_id, level_id))
+    if cached is None:
+        if content_id not in CONTENTS:
+            raise HTTPException(status_code=404, detail="Content not found")
         raise HTTPException(status_code=404, detail="Level not found")
     
-    level = levels[level_id]
-    drop_ids = level.get("drops", [])
-    items = DATA.get("items", {})
-    
-    result = []
-    for item_id in drop_ids:
-        if item_id in items:
-            item = items[item_id]
-            result.append({
-                "item_id": item_id,
-                "name": item.get("name", item_id),
-                "base_drop_percent": item.get("base_drop_percent", 0.0)
-            })
-    
-    return {"drops": result}
+    return Response(content=cached, media_type="application/json")
 
 @app.get("/contents/{content_id}/levels/{level_id}/monster-drops")
-def list_monster_drops(content_id: str, level_id: str):
+async def list_monster_drops(content_id: str, level_id: str):
     """Retorna tabela de drops por monstro para conteúdos tipo monster_table"""
-    contents = DATA.get("contents", {})
-    if content_id not in contents:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
-    content = contents[content_id]
-    
-    # Verifica se é do tipo monster_table
-    if content.get("type") != "monster_table":
-        raise HTTPException(status_code=400, detail="This content type doesn't support monster tables")
-    
-    levels = content.get("levels", {})
-    if level_id not in levels:
+    cached = GET_CACHE.get(("monster-drops", content_id, level_id))
+    if cached is None:
+        if content_id not in CONTENTS:
+            raise HTTPException(status_code=404, detail="Content not found")
+        
+        # Verifica se é do tipo monster_table
+        if CONTENTS[content_id].get("type") != "monster_table":
+            raise HTTPException(status_code=400, detail="This content type doesn't support monster tables")
+        
         raise HTTPException(status_code=404, detail="Level not found")
     
-    level = levels[level_id]
-    monsters = level.get("monsters", [])
-    drops_data = level.get("drops", {})
-    items = DATA.get("items", {})
-    
-    # Monta os dados dos monstros
-    monster_info = []
-    for monster_id in monsters:
-        monster_info.append({
-            "monster_id": monster_id,
-            "name": monster_id.replace("_", " ").title()
-        })
-    
-    # Monta os dados dos drops
-    drops_info = []
-    for item_id, monster_rates in drops_data.items():
-        if item_id in items:
-            item = items[item_id]
-            drop_entry = {
-                "item_id": item_id,
-                "item_name": item.get("name", item_id),
-                "rates": {}
-            }
-            
-            # Adiciona a taxa para cada monstro
-            for monster_id in monsters:
-                drop_entry["rates"][monster_id] = monster_rates.get(monster_id, 0.0)
-            
-            drops_info.append(drop_entry)
-    
-    return {
-        "content_id": content_id,
-        "level_id": level_id,
-        "monsters": monster_info,
-        "drops": drops_info
-    }
+    return Response(content=cached, media_type="application/json")
 
-@app.post("/drop/calculate-all")
-def calculate_all_drops(req: BatchCalculateRequest):
+@app.post("/drop/calculate-all", openapi_extra=msgspec_openapi(BatchCalculateRequest))
+async def calculate_all_drops(req: BatchCalculateRequest = Depends(msgspec_body(BatchCalculateRequest))):
     """Calcula taxas finais para TODOS os drops de um nível"""
-    contents = DATA.get("contents", {})
-    if req.content_id not in contents:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
-    content = contents[req.content_id]
-    levels = content.get("levels", {})
-    if req.level_id not in levels:
+    key = (req.content_id, req.level_id)
+    if key not in LEVEL_DROPS:
+        if req.content_id not in CONTENTS:
+            raise HTTPException(status_code=404, detail="Content not found")
         raise HTTPException(status_code=404, detail="Level not found")
     
-    level = levels[req.level_id]
-    drop_ids = level.get("drops", [])
-    items = DATA.get("items", {})
+    # Processa consumíveis e mods uma vez
+    B_general, B_final = _resolve_mods(req, req.content_id)
     
-    # Processa consumíveis uma vez
-    selected = set(req.consumables)
-    
-    # 1 — maior bônus dos 4 principais
-    best_big = max((BIG_CONS[c] for c in selected if c in BIG_CONS), default=0.0)
-    
-    general_mods = dict(req.general_mods) if req.general_mods else {}
-    if best_big > 0:
-        general_mods["consumable_big"] = best_big
-    
-    # flags
-    used_calice = "calice" in selected
-    used_calice2 = "calice2" in selected
-    used_big = used_calice or used_calice2
-    
-    # 2 — consumíveis gerais SOMADOS com regras
-    for key, val in GENERAL_CONS.items():
-        if key not in selected:
-            continue
-        
-        if key in ("lata", "revitalizadora"):
-            if not used_big:
-                general_mods[key] = val
-        elif key == "drop_pot":
-            if not used_calice:
-                general_mods[key] = val
-        else:
-            general_mods[key] = val
-    
-    # 3 — consumíveis finais sempre somam
-    final_mods = dict(req.final_mods) if req.final_mods else {}
-    for key, val in FINAL_CONS.items():
-        if key in selected:
-            final_mods[f"final_{key}"] = val
-
-    # Lógica condicional da reputação domínio
-     # Só aplica se for conteúdo dominio
-    if req.content_id == "dominio":
-        # Mantém o bônus que veio do frontend
-        pass
-    else:
-        # Remove o bônus se não for domínio
-        if "dominio_reputation" in general_mods:
-            del general_mods["dominio_reputation"]
-
-    # Só aplica se for conteúdo Villa of zenys
-    if req.content_id == "villa_of_zenys":
-
-        # Mantém o bônus que veio do frontend
-        pass
-    else:
-        # Remove o bônus se não for villa_of_zenys
-        if "member_bonus" in general_mods:
-           del general_mods["member_bonus"]
-    
-
-    
-            
-    
-    # Calcula para cada item
-    B_general = sum(general_mods.values())
-    B_final = sum(final_mods.values())
+    p_inter_arr, p_final_arr = compute_rates(LEVEL_BASES[key], B_general, B_final)
     
     result = []
-    for item_id in drop_ids:
-        if item_id in items:
-            item = items[item_id]
-            p_base = float(item.get("base_drop_percent", 0.0))
-            is_florzinha = item.get("is_florzinha", False)
-
-            p_inter = p_base * (1 + B_general / 100.0)
-            p_final = p_inter * (1 + B_final / 100.0)
-            p_final = apply_caps(p_base, p_final)
-            
-            result.append({
-                "item_id": item_id,
-                "item_name": item.get("name", item_id),
-                "base_drop_percent": p_base,
-                "B_general_percent": B_general,
-                "B_final_percent": B_final,
-                "p_inter_percent": p_inter,
-                "p_final_percent": p_final,
-                "is_florzinha": is_florzinha
-            })
+    for (item_id, name, p_base, is_florzinha), p_inter, p_final in zip(
+        LEVEL_DROPS[key], p_inter_arr.tolist(), p_final_arr.tolist()
+    ):
+        result.append({
+            "item_id": item_id,
+            "item_name": name,
+            "base_drop_percent": p_base,
+            "B_general_percent": B_general,
+            "B_final_percent": B_final,
+            "p_inter_percent": p_inter,
+            "p_final_percent": p_final,
+            "is_florzinha": is_florzinha
+        })
     
     return {
         "content_id": req.content_id,
@@ -314,174 +539,137 @@ def apply_caps(p_base_percent: float, p_final_percent: float) -> float:
         return 100.0
     return p_final_percent
 
-@app.post("/drop/calculate-monster-table")
-def calculate_monster_table(req: BatchCalculateRequest):
-    """Calcula taxas finais para todos os drops de um nível tipo monster_table"""
-    contents = DATA.get("contents", {})
-    if req.content_id not in contents:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
-    content = contents[req.content_id]
-    
-    if content.get("type") != "monster_table":
-        raise HTTPException(status_code=400, detail="This content type doesn't support monster tables")
-    
-    levels = content.get("levels", {})
-    if req.level_id not in levels:
-        raise HTTPException(status_code=404, detail="Level not found")
-    
-    level = levels[req.level_id]
-    monsters = level.get("monsters", [])
-    drops_data = level.get("drops", {})
-    items = DATA.get("items", {})
-    
-    # Processa consumíveis
-    selected = set(req.consumables)
-    best_big = max((BIG_CONS[c] for c in selected if c in BIG_CONS), default=0.0)
-    
-    general_mods = dict(req.general_mods) if req.general_mods else {}
-    if best_big > 0:
-        general_mods["consumable_big"] = best_big
-    
-    used_calice = "calice" in selected
-    used_calice2 = "calice2" in selected
-    used_big = used_calice or used_calice2
-    
-    for key, val in GENERAL_CONS.items():
-        if key not in selected:
-            continue
-        if key in ("lata", "revitalizadora"):
-            if not used_big:
-                general_mods[key] = val
-        elif key == "drop_pot":
-            if not used_calice:
-                general_mods[key] = val
+
+@njit(cache=True)
+def _compute_rates(p_base, g, f, p_inter, p_final):
+    # Multiplicação + apply_caps numa única passada pelo array
+    for i in range(p_base.shape[0]):
+        b = p_base[i]
+        v = b * g
+        p_inter[i] = v
+        v = v * f
+        if b <= 90.0:
+            p_final[i] = 90.0 if v > 90.0 else v
+        elif b == 100.0:
+            p_final[i] = 100.0
         else:
-            general_mods[key] = val
-    
-    final_mods = dict(req.final_mods) if req.final_mods else {}
-    for key, val in FINAL_CONS.items():
-        if key in selected:
-            final_mods[f"final_{key}"] = val
+            p_final[i] = v
+
+
+def compute_rates(p_base: np.ndarray, B_general: float, B_final: float):
+    """Retorna (p_inter, p_final) para um array (1D ou 2D) de taxas base"""
+    p_inter = np.empty_like(p_base)
+    p_final = np.empty_like(p_base)
+    _compute_rates(
+        p_base.reshape(-1),
+        1 + B_general / 100.0,
+        1 + B_final / 100.0,
+        p_inter.reshape(-1),
+        p_final.reshape(-1),
+    )
+    return p_inter, p_final
+
+
+# Compila o kernel na inicialização para não pagar o JIT na primeira requisição
+compute_rates(np.zeros(1, dtype=np.float64), 0.0, 0.0)
+
+def _monster_table_finals(req: BatchCalculateRequest):
+    """Valida o nível monster_table e retorna (key, B_general, B_final, matriz de taxas finais)"""
+    key = (req.content_id, req.level_id)
+    if key not in MONSTER_BASE:
+        if req.content_id not in CONTENTS:
+            raise HTTPException(status_code=404, detail="Content not found")
+        
+        # Verifica se é do tipo monster_table
+        if CONTENTS[req.content_id].get("type") != "monster_table":
+            raise HTTPException(status_code=400, detail="This content type doesn't support monster tables")
+        
+        raise HTTPException(status_code=404, detail="Level not found")
     
-
-    # Só aplica se for conteúdo dominio
-    if req.content_id == "dominio":
-        # Mantém o bônus que veio do frontend
-        pass
-    else:
-        # Remove o bônus se não for domínio
-        if "dominio_reputation" in general_mods:
-            del general_mods["dominio_reputation"]
+    # Processa consumíveis e mods
+    B_general, B_final = _resolve_mods(req, req.content_id)
     
-    # Só aplica se for conteúdo Villa of zenys
-    if req.content_id == "villa_of_zenys":
-
-        # Mantém o bônus que veio do frontend
-        pass
-    else:
-        # Remove o bônus se não for villa_of_zenys
-        if "member_bonus" in general_mods:
-           del general_mods["member_bonus"]
+    # Calcula para cada item e monstro
+    _, p_final_mat = compute_rates(MONSTER_BASE[key], B_general, B_final)
+    return key, B_general, B_final, p_final_mat
 
 
-    B_general = sum(general_mods.values())
-    B_final = sum(final_mods.values())
-    
-    # Calcula para cada item e monstro
-    monster_info = [{"monster_id": m, "name": m.replace("_", " ").title()} for m in monsters]
+@app.post("/drop/calculate-monster-table", openapi_extra=msgspec_openapi(BatchCalculateRequest))
+async def calculate_monster_table(req: BatchCalculateRequest = Depends(msgspec_body(BatchCalculateRequest))):
+    """Calcula taxas finais para todos os drops de um nível tipo monster_table"""
+    key, B_general, B_final, p_final_mat = _monster_table_finals(req)
+    monsters, level_drops = MONSTER_DROPS[key]
     
     result_drops = []
-    for item_id, monster_rates in drops_data.items():
-        if item_id in items:
-            item = items[item_id]
-            drop_entry = {
-                "item_id": item_id,
-                "item_name": item.get("name", item_id),
-                "calculated_rates": {}
+    for (item_id, name, rates), finals in zip(level_drops, p_final_mat.tolist()):
+        result_drops.append({
+            "item_id": item_id,
+            "item_name": name,
+            "calculated_rates": {
+                monster_id: {"base": p_base, "final": p_final}
+                for monster_id, p_base, p_final in zip(monsters, rates, finals)
             }
-            
-            for monster_id in monsters:
-                p_base = float(monster_rates.get(monster_id, 0.0))
-                p_inter = p_base * (1 + B_general / 100.0)
-                p_final = p_inter * (1 + B_final / 100.0)
-                p_final = apply_caps(p_base, p_final)
-                
-                drop_entry["calculated_rates"][monster_id] = {
-                    "base": p_base,
-                    "final": p_final
-                }
-            
-            result_drops.append(drop_entry)
+        })
     
     return {
         "content_id": req.content_id,
         "level_id": req.level_id,
         "B_general_percent": B_general,
         "B_final_percent": B_final,
-        "monsters": monster_info,
+        "monsters": LEVEL_MONSTER_INFO[key],
         "drops": result_drops
     }
 
-@app.post("/drop/calculate")
-def drop_calculate(s: Scenario):
-    item = DATA.get("items", {}).get(s.item_id)
-    if not item:
+
+@app.post("/drop/calculate-monster-table/matrix", openapi_extra=msgspec_openapi(BatchCalculateRequest))
+async def calculate_monster_table_matrix(req: BatchCalculateRequest = Depends(msgspec_body(BatchCalculateRequest))):
+    """Mesmo cálculo de calculate_monster_table, com as taxas em matrizes [item][monstro]"""
+    key, B_general, B_final, p_final_mat = _monster_table_finals(req)
+    
+    # As matrizes NumPy são serializadas direto pelo orjson, sem .tolist()
+    return ORJSONResponse({
+        "content_id": req.content_id,
+        "level_id": req.level_id,
+        "B_general_percent": B_general,
+        "B_final_percent": B_final,
+        "monsters": LEVEL_MONSTER_INFO[key],
+        "item_ids": MONSTER_ITEM_IDS[key],
+        "item_names": MONSTER_ITEM_NAMES[key],
+        "base_rates": MONSTER_BASE[key],
+        "final_rates": p_final_mat
+    })
+
+def _resolve_drop_rates(s: Scenario):
+    """Retorna (p_base, B_general, B_final, p_inter, p_final) do item do cenário"""
+    item = ITEMS.get(s.item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
 
-    p_base = float(item.get("base_drop_percent", 0.0))
+    p_base = item.base
 
     selected = set(s.consumables)
-    best_big = max((BIG_CONS[c] for c in selected if c in BIG_CONS), default=0.0)
-
-    if best_big > 0:
-        s.general_mods["consumable_big"] = best_big
-
-    used_calice = "calice" in selected
-    used_calice2 = "calice2" in selected
-    used_big = used_calice or used_calice2
-
-    for key, val in GENERAL_CONS.items():
-        if key not in selected:
-            continue
-        if key in ("lata", "revitalizadora"):
-            if not used_big:
-                s.general_mods[key] = val
-        elif key == "drop_pot":
-            if not used_calice:
-                s.general_mods[key] = val
-        else:
-            s.general_mods[key] = val
 
-    for key, val in FINAL_CONS.items():
-        if key in selected:
-            s.final_mods[f"final_{key}"] = val
+    # Maestrias entram depois dos consumíveis finais
+    masteries = {}
+    for name, mastery in (("adv_mastery", ADV_MASTERY), ("birth_mastery", BIRTH_MASTERY), ("reborn_mastery", REBORN_MASTERY)):
+        for key, val in mastery.items():
+            if key in selected:
+                masteries[name] = val
+                break
 
-    ADV_MASTERY = {"adv_1": 1.0, "adv_2": 3.0, "adv_3": 5.0, "adv_4": 8.0}
-    BIRTH_MASTERY = {"birth_1": 1.0, "birth_2": 2.0, "birth_3": 3.0, "birth_4": 5.0}
-    REBORN_MASTERY = {"reborn_1": 1.0, "reborn_2": 2.0, "reborn_3": 3.0, "reborn_4": 5.0, "reborn_5": 8.0}
-
-    for key, val in ADV_MASTERY.items():
-        if key in selected:
-            s.final_mods["adv_mastery"] = val
-            break
-
-    for key, val in BIRTH_MASTERY.items():
-        if key in selected:
-            s.final_mods["birth_mastery"] = val
-            break
-
-    for key, val in REBORN_MASTERY.items():
-        if key in selected:
-            s.final_mods["reborn_mastery"] = val
-            break
-
-    B_general = sum(s.general_mods.values()) if s.general_mods else 0.0
-    B_final = sum(s.final_mods.values()) if s.final_mods else 0.0
+    B_general, B_final = _resolve_mods(s, extra_final=masteries)
+    # Sem mods esta rota sempre respondeu 0.0 (e não 0)
+    B_general, B_final = float(B_general), float(B_final)
 
     p_inter = p_base * (1 + B_general / 100.0)
     p_final = p_inter * (1 + B_final / 100.0)
     p_final = apply_caps(p_base, p_final)
+    return p_base, B_general, B_final, p_inter, p_final
+
+
+@app.post("/drop/calculate", openapi_extra=msgspec_openapi(Scenario))
+def drop_calculate(s: Scenario = Depends(msgspec_body(Scenario))):
+    p_base, B_general, B_final, p_inter, p_final = _resolve_drop_rates(s)
 
     base_flor = 2.0
     flor_inter = base_flor * (1 + B_general / 100.0)
@@ -494,7 +682,7 @@ def drop_calculate(s: Scenario):
     prob_at_least_one = 1 - (1 - p_final_frac) ** num_kills
     expected = num_kills * p_final_frac
     expected_kills_to_one = (1 / p_final_frac) if p_final_frac > 0 else None
-    median_kills_50 = (math.log(0.5) / math.log(1 - p_final_frac)) if p_final_frac > 0 else None
+    median_kills_50 = (_LOG_HALF / math.log(1 - p_final_frac)) if p_final_frac > 0 else None
 
     return {
         "item_id": s.item_id,
@@ -512,24 +700,51 @@ def drop_calculate(s: Scenario):
     }
 
 
-@app.post("/drop/simulate")
-def drop_simulate(s: Scenario):
-    calc = drop_calculate(s)
-    p_final_frac = calc["p_final_percent"] / 100.0
-    sims = max(1, int(s.mc_simulations))
-    rng = random.Random(int(time.time() * 1000))
+MAX_KILLS_PER_SIM = 1_000_000
 
-    kills_to_get = []
-    MAX_KILLS_PER_SIM = 1_000_000
 
-    for _ in range(sims):
+@njit(parallel=True, cache=True)
+def _simulate_kills(p, sims, cap, seeds):
+    # Monte Carlo kill a kill, com um LCG de 64 bits por simulação
+    out = np.empty(sims, dtype=np.int64)
+    for i in prange(sims):
+        state = seeds[i]
         kills = 0
-        got = False
-        while not got and kills < MAX_KILLS_PER_SIM:
+        while kills < cap:
             kills += 1
-            if rng.random() < p_final_frac:
-                got = True
-        kills_to_get.append(kills)
+            state = state * np.uint64(6364136223846793005) + np.uint64(1442695040888963407)
+            if (state >> np.uint64(11)) * (1.0 / 9007199254740992.0) < p:
+                break
+        out[i] = kills
+    return out
+
+
+# drop_simulate roda no threadpool do FastAPI; o kernel paralelo não pode ser
+# chamado de duas threads ao mesmo tempo (a camada workqueue aborta o processo)
+_SIMULATE_LOCK = threading.Lock()
+
+if SIMULATION_METHOD == "monte_carlo":
+    # Compila o kernel na inicialização para não pagar o JIT na primeira requisição
+    _simulate_kills(0.5, 1, 1, np.zeros(1, dtype=np.uint64))
+
+
+@app.post("/drop/simulate", openapi_extra=msgspec_openapi(Scenario))
+def drop_simulate(s: Scenario = Depends(msgspec_body(Scenario))):
+    p_final_frac = _resolve_drop_rates(s)[4] / 100.0
+    sims = max(1, int(s.mc_simulations))
+    rng = np.random.default_rng(int(time.time() * 1000))
+
+    if p_final_frac <= 0:
+        kills_to_get = np.full(sims, MAX_KILLS_PER_SIM, dtype=np.int64)
+    elif SIMULATION_METHOD == "monte_carlo":
+        seeds = rng.integers(2**64, size=sims, dtype=np.uint64)
+        with _SIMULATE_LOCK:
+            kills_to_get = _simulate_kills(p_final_frac, sims, MAX_KILLS_PER_SIM, seeds)
+    else:
+        # Kills até o primeiro drop seguem uma distribuição geométrica:
+        # sorteia todas as simulações de uma vez em vez de rolar kill a kill
+        kills_to_get = rng.geometric(min(p_final_frac, 1.0), size=sims)
+        np.minimum(kills_to_get, MAX_KILLS_PER_SIM, out=kills_to_get)
 
     kills_to_get.sort()
     median = kills_to_get[len(kills_to_get) // 2]
@@ -537,12 +752,12 @@ def drop_simulate(s: Scenario):
     def percentile(arr, p):
         idx = int(p / 100.0 * len(arr))
         idx = min(max(0, idx), len(arr) - 1)
-        return arr[idx]
+        return int(arr[idx])
 
     return {
         "simulations": sims,
-        "avg_kills": sum(kills_to_get) / len(kills_to_get),
-        "median_kills": median,
+        "avg_kills": float(kills_to_get.mean()),
+        "median_kills": int(median),
         "p10": percentile(kills_to_get, 10),
         "p25": percentile(kills_to_get, 25),
         "p75": percentile(kills_to_get, 75),